@@ -0,0 +1,49 @@
+"""Compare two benchmark result files, e.g. from two commits"""
+import argparse
+import json
+import sys
+
+
+def compare(baseline, current, threshold):
+    """Print a per-case comparison and return the names of cases slower than threshold"""
+    regressions = []
+    base_results = baseline['results']
+    print(f"{'Case':<28}{'Baseline (ms)':>15}{'Current (ms)':>15}{'Change':>10}")
+    print("-" * 68)
+    for name, stat in current['results'].items():
+        base = base_results.get(name)
+        if 'skipped' in stat or not base or 'skipped' in base:
+            print(f"{name:<28}{'-':>15}{'-':>15}{'n/a':>10}")
+            continue
+        old = base['median_s'] * 1000
+        new = stat['median_s'] * 1000
+        change = (new - old) / old if old else 0.0
+        marker = " !" if change > threshold else ""
+        print(f"{name:<28}{old:>15.2f}{new:>15.2f}{change:>+9.1%}{marker}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Relative slowdown of the median that counts as a regression (default 0.10)")
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, encoding='utf-8') as f:
+        current = json.load(f)
+
+    print(f"Baseline: {baseline['meta'].get('revision')}  Current: {current['meta'].get('revision')}")
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f"Regressions over {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+"""
+Benchmark suite for the scan, selection and prompt paths.
+
+Run from the repository root:
+
+    python -m benchmarks.run_benchmarks --files 5000 --output bench.json
+    python -m benchmarks.compare old.json new.json
+
+Core cases call the app's methods on an instance created without a Tk
+interpreter. Tk cases (tree population, selection toggles, JSON highlighting)
+need a display; on a headless machine run under Xvfb, e.g.
+`xvfb-run python -m benchmarks.run_benchmarks`. Without a display they are
+recorded as skipped.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import CodebaseToPromptApp, IGNORED_DIRECTORIES  # noqa: E402
+from file_tree_store import FileTreeStore  # noqa: E402
+from path_search import PathSearchIndex  # noqa: E402
+from selection_profiles import match_profile  # noqa: E402
+from benchmarks.synthetic_repo import generate_paths, generate_repo  # noqa: E402
+
+
+def _make_core_app(root_path):
+    """Create an app instance without a Tk interpreter, for the Tk-free code paths"""
+    app = object.__new__(CodebaseToPromptApp)
+    app._init_state()
+    app.root_path = root_path
+    return app
+
+
+def _time_case(func, repeat, setup=None):
+    """Run func repeat times and return timing statistics; setup runs untimed before each run"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        result = func(arg) if setup else func()
+        timings.append(time.perf_counter() - start)
+    return {
+        'runs': repeat,
+        'min_s': min(timings),
+        'median_s': statistics.median(timings),
+        'max_s': max(timings),
+    }, result
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_core_cases(root, repeat):
+    results = {}
+    app = _make_core_app(root)
+
+    stats, tree = _time_case(lambda: app._scan_directory(root), repeat)
+    results['scan_directory'] = stats
+    app.file_tree_data = tree
+    all_paths = [tree.path(node) for node in tree.files]
+
+    # Sniff every file under the root, including the ones the scanner skips by extension
+    sniff_paths = []
+    for dirpath, _, filenames in os.walk(root):
+        sniff_paths.extend(os.path.join(dirpath, f) for f in filenames)
+    stats, _ = _time_case(lambda: [app._is_text_likely(p) for p in sniff_paths], repeat)
+    stats['files'] = len(sniff_paths)
+    results['text_sniffing'] = stats
+
+    stats, _ = _time_case(lambda: [app.search_index.search(q) for q in SEARCH_QUERIES], repeat)
+    stats['queries'] = len(SEARCH_QUERIES)
+    results['path_search'] = stats
+
+    profile = {'include': ['*.py', '*/http*'], 'exclude': ['*/db_*'], 'paths': []}
+    stats, matched = _time_case(lambda: match_profile(profile, tree.relative_file_paths()), repeat)
+    stats['matched'] = len(matched)
+    results['profile_match'] = stats
+
+    def _read_and_generate(_):
+        contents = {p: app._read_file_content(p) for p in all_paths}
+        return app._generate_prompt_text(all_paths, contents)
+
+    def _cold_cache():
+        app.file_contents = {}
+
+    stats, prompt = _time_case(_read_and_generate, repeat, setup=_cold_cache)
+    stats['chars'] = len(prompt)
+    results['prompt_generation_cold'] = stats
+
+    contents = {p: app._read_file_content(p) for p in all_paths}
+    stats, _ = _time_case(lambda: app._generate_prompt_text(all_paths, contents), repeat)
+    results['prompt_generation_warm'] = stats
+
+    stats, plan = _time_case(lambda: app._plan_prompt_shards(all_paths, 100000 * 4), repeat)
+    stats['shards'] = len(plan)
+    results['shard_planning'] = stats
+    for budget_chars in (2000, 8000, 100000 * 4):
+        _check_shard_budget(app, sorted(all_paths), budget_chars)
+
+    results.update(run_tree_store_cases(root, repeat))
+    return results
+
+
+def _check_shard_budget(app, sorted_paths, budget_chars):
+    """Render every planned shard and fail if any is longer than the budget"""
+    plan = app._plan_prompt_shards(sorted_paths, budget_chars)
+    for index, segments in enumerate(plan, start=1):
+        length = len(app._render_prompt_shard(segments, index, len(plan)))
+        if length > budget_chars:
+            raise AssertionError(f"shard {index} of {len(plan)} has {length} chars, budget is {budget_chars}")
+
+
+SEARCH_QUERIES = ["u", "ut", "utils", "u/http", "http.py", "core api", "a b c", "zzz"]
+
+
+def run_search_cases(repeat, num_paths, seed):
+    """Index build and per-query search times over num_paths synthetic paths, no files on disk"""
+    paths = generate_paths(num_paths, seed=seed)
+    results = {}
+    stats, index = _time_case(lambda: PathSearchIndex(paths), repeat)
+    stats['paths'] = num_paths
+    stats['retained_bytes'] = _retained_bytes(lambda: PathSearchIndex(paths))
+    results['path_search_index_build'] = stats
+    for query in SEARCH_QUERIES:
+        stats, matches = _time_case(lambda: index.search(query), repeat)
+        stats['matches'] = len(matches)
+        results[f"path_search_{num_paths // 1000}k[{query}]"] = stats
+    return results
+
+
+def _walk_entries(root):
+    """Collect (dirpath, sorted dirnames, sorted (filename, size)) once, so tree builds can be timed without I/O"""
+    entries = []
+    for dirpath, dirnames, filenames in os.walk(root, topdown=True):
+        dirnames[:] = sorted(d for d in dirnames if d not in IGNORED_DIRECTORIES)
+        files = [(f, os.path.getsize(os.path.join(dirpath, f))) for f in sorted(filenames)]
+        entries.append((dirpath, list(dirnames), files))
+    return entries
+
+
+def _build_dict_tree(root, entries):
+    """The previous representation: one dict per node plus the iid_map/path_to_iid copies of every path"""
+    tree = {'name': os.path.basename(root), 'path': root, 'is_dir': True, 'children': []}
+    path_map = {root: tree}
+    all_paths = [root]
+    for dirpath, dirnames, files in entries:
+        parent_node = path_map[dirpath]
+        for dirname in dirnames:
+            path = os.path.join(dirpath, dirname)
+            node = {'name': dirname, 'path': path, 'is_dir': True, 'children': []}
+            parent_node['children'].append(node)
+            path_map[path] = node
+            all_paths.append(path)
+        for filename, size in files:
+            path = os.path.join(dirpath, filename)
+            parent_node['children'].append({'name': filename, 'path': path, 'is_dir': False, 'size': size})
+            all_paths.append(path)
+    iid_map = {}
+    path_to_iid = {}
+    for n, path in enumerate(all_paths):
+        iid = f"I{n + 1:03X}"  # Treeview-style item IDs
+        iid_map[iid] = path
+        path_to_iid[path] = iid
+    return tree, iid_map, path_to_iid
+
+
+def _build_store(root, entries):
+    store = FileTreeStore(root)
+    dir_nodes = {root: 0}
+    for dirpath, dirnames, files in entries:
+        parent_node = dir_nodes.pop(dirpath)
+        for dirname in dirnames:
+            dir_nodes[os.path.join(dirpath, dirname)] = store.add_dir(parent_node, dirname)
+        for filename, size in files:
+            store.add_file(parent_node, filename, size)
+    store.finish()
+    return store
+
+
+def _retained_bytes(build):
+    """Bytes still allocated by the result of build()"""
+    tracemalloc.start()
+    try:
+        result = build()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return current
+
+
+def run_tree_store_cases(root, repeat):
+    """Compare the compact FileTreeStore with the previous dict-per-node tree"""
+    entries = _walk_entries(root)
+    results = {}
+    for name, build in (('tree_build_dicts', _build_dict_tree), ('tree_build_store', _build_store)):
+        stats, _ = _time_case(lambda: build(root, entries), repeat)
+        stats['retained_bytes'] = _retained_bytes(lambda: build(root, entries))
+        results[name] = stats
+    return results
+
+
+def _make_broken_json(items):
+    """Build an LLM-style response wrapping a large, slightly broken JSON document"""
+    records = [
+        f'{{"id": {i}, "name": "item {i}", "tags": ["a", "b"], "active": true, "score": {i * 1.5}}}'
+        for i in range(items)
+    ]
+    # Trailing comma and a missing closing bracket, as models often produce
+    return "Here is the JSON you asked for:\n```json\n{\"items\": [" + ", ".join(records) + ",\n```"
+
+
+def run_json_cases(repeat, items):
+    results = {}
+    try:
+        from json_repair import repair_json
+        from pygments import lex
+        from pygments.lexers import JsonLexer
+    except ImportError as e:
+        return {'json_repair': {'skipped': str(e)}}, None
+
+    broken = _make_broken_json(items)
+    stats, repaired = _time_case(lambda: json.dumps(json.loads(repair_json(broken)), indent=2), repeat)
+    stats['chars'] = len(broken)
+    results['json_repair'] = stats
+
+    stats, tokens = _time_case(lambda: list(lex(repaired, JsonLexer())), repeat)
+    stats['tokens'] = len(tokens)
+    results['json_lexing'] = stats
+    return results, repaired
+
+
+def run_tk_cases(root, repeat, json_text):
+    import tkinter as tk
+    try:
+        app = CodebaseToPromptApp()
+    except tk.TclError as e:
+        reason = f"no display: {e}"
+        return {name: {'skipped': reason} for name in
+                ('populate_tree', 'select_all_toggle', 'refresh_check_states', 'json_highlighting')}
+
+    results = {}
+    try:
+        app.withdraw()
+        app.root_path = root
+        app.file_tree_data = app._scan_directory(root)
+
+        stats, _ = _time_case(app._populate_tree, repeat)
+        stats['items'] = len(app.file_tree_data)
+        results['populate_tree'] = stats
+
+        # Cascade select/deselect from the root, as a click on the root checkbox does
+        root_iid = "0"
+
+        def _toggle():
+            app._update_descendants_check_state(root_iid, True)
+            app._update_descendants_check_state(root_iid, False)
+
+        stats, _ = _time_case(_toggle, repeat)
+        results['select_all_toggle'] = stats
+
+        app.selected_nodes = set(app.file_tree_data.files[::2])
+        stats, _ = _time_case(app._refresh_check_states, repeat)
+        results['refresh_check_states'] = stats
+
+        if json_text:
+            from json_repair_window import JsonRepairWindow
+            window = JsonRepairWindow(app)
+            window.output_text.config(state="normal")
+            window.output_text.insert("1.0", json_text)
+            stats, _ = _time_case(lambda: window._highlight_json(json_text), repeat)
+            results['json_highlighting'] = stats
+            window.destroy()
+    finally:
+        app.destroy()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the codebase2prompt benchmark suite")
+    parser.add_argument("--files", type=int, default=2000, help="Number of files in the synthetic repo")
+    parser.add_argument("--depth", type=int, default=5)
+    parser.add_argument("--median-size", type=int, default=2048)
+    parser.add_argument("--binary-ratio", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--search-paths", type=int, default=100000,
+                        help="Number of synthetic paths in the path search cases")
+    parser.add_argument("--json-items", type=int, default=2000, help="Records in the JSON repair input")
+    parser.add_argument("--no-tk", action="store_true", help="Skip the cases that need a Tk display")
+    parser.add_argument("--repo", help="Reuse an existing directory instead of generating one")
+    parser.add_argument("--output", default="bench_output.json")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="c2p-bench-") as tmp:
+        if args.repo:
+            root = os.path.abspath(args.repo)
+            repo_info = {'root': root}
+        else:
+            root = os.path.join(tmp, "repo")
+            repo_info = generate_repo(root, num_files=args.files, max_depth=args.depth,
+                                      median_size=args.median_size, binary_ratio=args.binary_ratio,
+                                      seed=args.seed)
+
+        results = run_core_cases(root, args.repeat)
+        results.update(run_search_cases(args.repeat, args.search_paths, args.seed))
+        json_results, json_text = run_json_cases(args.repeat, args.json_items)
+        results.update(json_results)
+        if not args.no_tk:
+            results.update(run_tk_cases(root, args.repeat, json_text))
+
+    report = {
+        'meta': {
+            'revision': _git_revision(),
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+            'repo': repo_info,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    for name, stat in results.items():
+        if 'skipped' in stat:
+            print(f"{name:<28} skipped ({stat['skipped']})")
+        else:
+            print(f"{name:<28} median {stat['median_s'] * 1000:>10.2f} ms")
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Deterministic generator for synthetic repositories used by the benchmarks"""
+import argparse
+import math
+import os
+import random
+
+TEXT_EXTENSIONS = ['.py', '.js', '.ts', '.md', '.json', '.css', '.html', '.go', '.rs', '.yaml']
+# Not in LIKELY_TEXT_EXTENSIONS or IGNORED_FILES, so the scanner has to sniff them
+UNKNOWN_EXTENSIONS = ['.dat', '.out', '.blob', '.txt2']
+WORDS = ['core', 'utils', 'http', 'api', 'models', 'views', 'client', 'server', 'db', 'io',
+         'parser', 'config', 'auth', 'cache', 'events', 'tasks', 'render', 'store', 'net', 'cli']
+
+
+def _make_text(rng, size):
+    """Build roughly size bytes of code-like text"""
+    lines = []
+    total = 0
+    while total < size:
+        indent = "    " * rng.randint(0, 3)
+        words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 10)))
+        line = f"{indent}{words} = {rng.randint(0, 99999)}"
+        lines.append(line)
+        total += len(line) + 1
+    return "\n".join(lines)[:size] + "\n"
+
+
+def generate_repo(root, num_files=2000, max_depth=5, dirs_per_level=4, median_size=2048,
+                  size_sigma=1.2, max_size=1024 * 1024, binary_ratio=0.05, seed=0):
+    """
+    Create a synthetic repository under root and return a summary dict.
+
+    File sizes follow a log-normal distribution around median_size (clipped
+    to max_size); binary_ratio of the files contain NUL bytes. Half of the
+    binary files and a few text files use extensions the scanner does not
+    know, so both branches of the text sniffing are exercised. The same
+    arguments always produce byte-identical trees.
+    """
+    rng = random.Random(seed)
+    os.makedirs(root, exist_ok=True)
+
+    # Build the directory skeleton breadth-first up to max_depth
+    dirs = [root]
+    frontier = [root]
+    for depth in range(max_depth):
+        next_frontier = []
+        for parent in frontier:
+            for i in range(rng.randint(1, dirs_per_level)):
+                path = os.path.join(parent, f"{rng.choice(WORDS)}_{depth}_{i}")
+                os.makedirs(path, exist_ok=True)
+                next_frontier.append(path)
+        dirs.extend(next_frontier)
+        frontier = next_frontier
+
+    mu = math.log(max(median_size, 1))
+    total_bytes = 0
+    binary_files = 0
+    for n in range(num_files):
+        directory = rng.choice(dirs)
+        size = min(int(rng.lognormvariate(mu, size_sigma)) + 1, max_size)
+        is_binary = rng.random() < binary_ratio
+        if is_binary:
+            ext = rng.choice(UNKNOWN_EXTENSIONS) if rng.random() < 0.5 else '.bin'
+            data = bytes(rng.getrandbits(8) for _ in range(min(size, 4096))) + b'\0' * max(size - 4096, 1)
+            binary_files += 1
+        else:
+            ext = rng.choice(UNKNOWN_EXTENSIONS) if rng.random() < 0.05 else rng.choice(TEXT_EXTENSIONS)
+            data = _make_text(rng, size).encode('utf-8')
+        path = os.path.join(directory, f"{rng.choice(WORDS)}_{n}{ext}")
+        with open(path, 'wb') as f:
+            f.write(data)
+        total_bytes += len(data)
+
+    return {
+        'root': root,
+        'seed': seed,
+        'files': num_files,
+        'directories': len(dirs),
+        'binary_files': binary_files,
+        'total_bytes': total_bytes,
+    }
+
+
+def generate_paths(num_files=100000, max_depth=6, dirs_per_level=4, seed=0):
+    """
+    Return num_files '/'-separated relative file paths laid out like
+    generate_repo's trees and listed directory by directory, without touching
+    the disk. Used for search cases
+    that need far more files than are practical to create.
+    """
+    rng = random.Random(seed)
+    dirs = [""]
+    frontier = [""]
+    for depth in range(max_depth):
+        next_frontier = []
+        for parent in frontier:
+            for i in range(rng.randint(1, dirs_per_level)):
+                name = f"{rng.choice(WORDS)}_{depth}_{i}"
+                next_frontier.append(f"{parent}/{name}" if parent else name)
+        dirs.extend(next_frontier)
+        frontier = next_frontier
+
+    files = {directory: [] for directory in dirs}
+    for n in range(num_files):
+        directory = rng.choice(dirs)
+        files[directory].append(f"{rng.choice(WORDS)}_{n}{rng.choice(TEXT_EXTENSIONS)}")
+    # Grouped by directory, as the scanner lists them
+    return [f"{directory}/{name}" if directory else name
+            for directory, names in files.items() for name in names]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic repository")
+    parser.add_argument("root", help="Directory to create the repository in")
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--depth", type=int, default=5)
+    parser.add_argument("--dirs-per-level", type=int, default=4)
+    parser.add_argument("--median-size", type=int, default=2048)
+    parser.add_argument("--size-sigma", type=float, default=1.2)
+    parser.add_argument("--binary-ratio", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    summary = generate_repo(args.root, num_files=args.files, max_depth=args.depth,
+                            dirs_per_level=args.dirs_per_level, median_size=args.median_size,
+                            size_sigma=args.size_sigma, binary_ratio=args.binary_ratio, seed=args.seed)
+    print(summary)
+
+
+if __name__ == "__main__":
+    main()
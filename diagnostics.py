@@ -0,0 +1,203 @@
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+import cProfile
+import io
+import json
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PerfStats:
+    """
+    Lightweight, thread-safe instrumentation: per-stage timers, named counters
+    and an optional cProfile capture of the outermost stage on each thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.profiling_enabled = False
+        self.reset()
+
+    def reset(self):
+        """Clear all timers, counters and profile data"""
+        with self._lock:
+            self.stages = {}
+            self.counters = {}
+            self._profile_stats = None
+
+    @contextmanager
+    def stage(self, name):
+        """Time a block of code and record it under the given stage name"""
+        depth = getattr(self._local, "depth", 0)
+        profiler = None
+        # Only the outermost stage on a thread is profiled; nested profilers would conflict
+        if self.profiling_enabled and depth == 0:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                profiler = None
+
+        self._local.depth = depth + 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._local.depth = depth
+            if profiler:
+                profiler.disable()
+            with self._lock:
+                stat = self.stages.setdefault(name, {'calls': 0, 'total_s': 0.0, 'last_s': 0.0, 'max_s': 0.0})
+                stat['calls'] += 1
+                stat['total_s'] += elapsed
+                stat['last_s'] = elapsed
+                stat['max_s'] = max(stat['max_s'], elapsed)
+                if profiler:
+                    if self._profile_stats is None:
+                        self._profile_stats = pstats.Stats(profiler)
+                    else:
+                        self._profile_stats.add(profiler)
+
+    def incr(self, name, amount=1):
+        """Add amount to a named counter"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def profile_summary(self, limit=30):
+        """Return the top functions by cumulative time, or an empty string if nothing was profiled"""
+        with self._lock:
+            if self._profile_stats is None:
+                return ""
+            out = io.StringIO()
+            self._profile_stats.stream = out
+            self._profile_stats.sort_stats("cumulative").print_stats(limit)
+            return out.getvalue()
+
+    def snapshot(self):
+        """Return a JSON-serializable copy of the current numbers"""
+        with self._lock:
+            stages = {name: dict(stat) for name, stat in self.stages.items()}
+            counters = dict(self.counters)
+        return {
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'stages': stages,
+            'counters': counters,
+            'profile': self.profile_summary(),
+        }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2, ensure_ascii=False)
+
+
+class CountingTclProxy:
+    """
+    Stands in for a widget's Tcl interpreter (widget.tk) and counts every
+    command the widget sends through it; all other attributes are forwarded.
+    """
+
+    def __init__(self, tk_app, perf, counter="tcl_calls"):
+        self._tk_app = tk_app
+        self._perf = perf
+        self._counter = counter
+
+    def call(self, *args):
+        self._perf.incr(self._counter)
+        return self._tk_app.call(*args)
+
+    def __getattr__(self, name):
+        return getattr(self._tk_app, name)
+
+
+class DiagnosticsWindow(tk.Toplevel):
+    """Diagnostics panel showing pipeline stage timings and counters"""
+
+    def __init__(self, parent, perf):
+        super().__init__(parent)
+        self.title("Diagnostics")
+        self.geometry("800x600")
+        self.transient(parent)
+        self.perf = perf
+
+        self._create_widgets()
+        self._refresh()
+
+    def _create_widgets(self):
+        """Create all UI components"""
+        button_frame = ttk.Frame(self, padding=5)
+        button_frame.pack(fill="x", padx=10, pady=(10, 0))
+        ttk.Button(button_frame, text="Refresh", command=self._refresh).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Reset", command=self._reset).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Export JSON...", command=self._export_json).pack(side="left", padx=5)
+
+        self.profile_var = tk.BooleanVar(value=self.perf.profiling_enabled)
+        ttk.Checkbutton(
+            button_frame,
+            text="Enable cProfile capture",
+            variable=self.profile_var,
+            command=self._toggle_profiling
+        ).pack(side="right", padx=5)
+
+        text_container = ttk.Frame(self)
+        text_container.pack(fill="both", expand=True, padx=10, pady=10)
+        self.text = tk.Text(text_container, wrap="none", font=("Consolas", 10), state="disabled", bg="#f9f9f9")
+        v_scroll = ttk.Scrollbar(text_container, orient="vertical", command=self.text.yview)
+        h_scroll = ttk.Scrollbar(text_container, orient="horizontal", command=self.text.xview)
+        self.text.configure(yscrollcommand=v_scroll.set, xscrollcommand=h_scroll.set)
+        self.text.grid(row=0, column=0, sticky="nsew")
+        v_scroll.grid(row=0, column=1, sticky="ns")
+        h_scroll.grid(row=1, column=0, sticky="ew")
+        text_container.grid_rowconfigure(0, weight=1)
+        text_container.grid_columnconfigure(0, weight=1)
+
+    def _format_report(self, snapshot):
+        """Format a snapshot as a plain-text report"""
+        lines = [f"{'Stage':<24}{'Calls':>8}{'Last (ms)':>12}{'Max (ms)':>12}{'Total (ms)':>12}"]
+        lines.append("-" * 68)
+        for name, stat in snapshot['stages'].items():
+            lines.append(
+                f"{name:<24}{stat['calls']:>8}{stat['last_s'] * 1000:>12.1f}"
+                f"{stat['max_s'] * 1000:>12.1f}{stat['total_s'] * 1000:>12.1f}")
+        lines.append("")
+        lines.append(f"{'Counter':<24}{'Value':>16}")
+        lines.append("-" * 40)
+        for name, value in sorted(snapshot['counters'].items()):
+            lines.append(f"{name:<24}{value:>16,}")
+        if snapshot['profile']:
+            lines.append("")
+            lines.append("cProfile (cumulative):")
+            lines.append(snapshot['profile'])
+        return "\n".join(lines)
+
+    def _refresh(self):
+        """Redraw the report from the current numbers"""
+        self.text.config(state="normal")
+        self.text.delete("1.0", "end")
+        self.text.insert("1.0", self._format_report(self.perf.snapshot()))
+        self.text.config(state="disabled")
+
+    def _reset(self):
+        self.perf.reset()
+        self._refresh()
+
+    def _toggle_profiling(self):
+        self.perf.profiling_enabled = self.profile_var.get()
+
+    def _export_json(self):
+        """Save the current numbers as a JSON file"""
+        path = filedialog.asksaveasfilename(
+            parent=self,
+            defaultextension=".json",
+            filetypes=[("JSON files", "*.json"), ("All files", "*.*")],
+            initialfile="codebase2prompt-diagnostics.json"
+        )
+        if not path:
+            return
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(self.perf.to_json())
+        except OSError as e:
+            messagebox.showerror("Export Failed", f"Could not write diagnostics: {e}", parent=self)
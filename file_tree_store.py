@@ -0,0 +1,137 @@
+import os
+import sys
+from array import array
+
+
+class FileTreeStore:
+    """
+    Compact, array-backed file tree.
+
+    Nodes are integer indices into parallel arrays (parent, name id, size,
+    first child, child count, is_dir). Names are interned once in a shared
+    table and full paths are rebuilt on demand instead of being stored on
+    every node. Node 0 is the root directory.
+
+    Nodes must be added top-down with all children of a directory added
+    consecutively (as os.walk with topdown=True yields them), so that
+    every node's index is greater than its parent's and the children of a
+    directory occupy a contiguous index range.
+    """
+
+    __slots__ = ('root_path', 'names', '_name_ids', 'parent', 'name_id', 'size', 'first_child',
+                 'child_count', 'is_dir', 'files', 'has_files', '_dir_paths')
+
+    def __init__(self, root_path):
+        self.root_path = root_path
+        self.names = []  # Interned name table, indexed by name id
+        self._name_ids = {}
+        self.parent = array('i')
+        self.name_id = array('i')
+        self.size = array('q')
+        self.first_child = array('i')
+        self.child_count = array('i')
+        self.is_dir = bytearray()
+        self.files = array('i')  # File nodes in the order they were added
+        self.has_files = None  # Set by finish(): 1 for nodes with at least one file at or below them
+        self._dir_paths = {}  # Lazily built full paths of directory nodes only
+        self._append(-1, os.path.basename(root_path.rstrip("/\\")) or root_path, True, 0)
+
+    def __len__(self):
+        return len(self.parent)
+
+    def _append(self, parent, name, is_dir, size):
+        if self._name_ids is None:
+            raise ValueError("cannot add nodes after finish()")
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = len(self.names)
+            self.names.append(sys.intern(name))
+            self._name_ids[name] = name_id
+
+        node = len(self.parent)
+        self.parent.append(parent)
+        self.name_id.append(name_id)
+        self.size.append(size)
+        self.first_child.append(0)
+        self.child_count.append(0)
+        self.is_dir.append(1 if is_dir else 0)
+        if not is_dir:
+            self.files.append(node)
+
+        if parent >= 0:
+            if self.child_count[parent] == 0:
+                self.first_child[parent] = node
+            elif self.first_child[parent] + self.child_count[parent] != node:
+                raise ValueError("children of a directory must be added consecutively")
+            self.child_count[parent] += 1
+        return node
+
+    def finish(self):
+        """Release build-only state once all nodes have been added and compute has_files"""
+        self._name_ids = None
+        has_files = bytearray(len(self.parent))
+        for node in self.files:
+            has_files[node] = 1
+        # Children come after their parent, so a reverse pass sees every child before its parent
+        parent = self.parent
+        for node in range(len(parent) - 1, 0, -1):
+            if has_files[node]:
+                has_files[parent[node]] = 1
+        self.has_files = has_files
+
+    def add_dir(self, parent, name):
+        """Add a directory under parent and return its node"""
+        return self._append(parent, name, True, 0)
+
+    def add_file(self, parent, name, size):
+        """Add a file under parent and return its node"""
+        return self._append(parent, name, False, size)
+
+    def name(self, node):
+        return self.names[self.name_id[node]]
+
+    def children(self, node):
+        """Return the child nodes of node, in the order they were added"""
+        start = self.first_child[node]
+        return range(start, start + self.child_count[node])
+
+    def path(self, node):
+        """Rebuild the full path of node"""
+        if self.is_dir[node]:
+            return self._dir_path(node)
+        return os.path.join(self._dir_path(self.parent[node]), self.names[self.name_id[node]])
+
+    def _dir_path(self, node):
+        path = self._dir_paths.get(node)
+        if path is None:
+            if node == 0:
+                path = self.root_path
+            else:
+                path = os.path.join(self._dir_path(self.parent[node]), self.names[self.name_id[node]])
+            self._dir_paths[node] = path
+        return path
+
+    def relative_path(self, node):
+        """Rebuild the '/'-separated path of node relative to the root"""
+        parts = []
+        while node > 0:
+            parts.append(self.names[self.name_id[node]])
+            node = self.parent[node]
+        return "/".join(reversed(parts))
+
+    def relative_file_paths(self):
+        """Return the relative paths of all files, aligned with self.files"""
+        # Parents always precede their children, so one forward pass builds every directory's path
+        names, name_id, parent, is_dir = self.names, self.name_id, self.parent, self.is_dir
+        dir_paths = {0: ""}
+        for node in range(1, len(parent)):
+            if is_dir[node]:
+                prefix = dir_paths[parent[node]]
+                name = names[name_id[node]]
+                dir_paths[node] = f"{prefix}/{name}" if prefix else name
+        paths = []
+        for node in self.files:
+            prefix = dir_paths[parent[node]]
+            name = names[name_id[node]]
+            paths.append(f"{prefix}/{name}" if prefix else name)
+        return paths
@@ -0,0 +1,147 @@
+import os
+import re
+import subprocess
+
+
+class GitError(Exception):
+    """Raised when git is unavailable or a git command fails"""
+
+
+def _run_git(cwd, args, ok_codes=(0,)):
+    """Run a git command in cwd and return its stdout as text"""
+    try:
+        result = subprocess.run(
+            ["git", "-C", cwd] + args,
+            capture_output=True,
+            # Avoid flashing a console window from the windowed build on Windows
+            creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+        )
+    except OSError as e:
+        raise GitError(f"Could not run git: {e}")
+    if result.returncode not in ok_codes:
+        message = result.stderr.decode('utf-8', errors='ignore').strip()
+        raise GitError(message or f"git {args[0]} failed with exit code {result.returncode}")
+    return result.stdout.decode('utf-8', errors='ignore')
+
+
+def get_repo_prefix(path):
+    """Return the location of directory path inside its work tree, e.g. 'proj/src/' ('' at the top)"""
+    return _run_git(path, ["rev-parse", "--show-prefix"]).strip()
+
+
+def get_diff_base(root_path, base_ref=None):
+    """
+    Return the commit to diff against: HEAD without a base_ref, otherwise the
+    merge-base of base_ref and HEAD, so only changes made on the current
+    branch since it forked from base_ref count (not those made on base_ref).
+    """
+    if not base_ref:
+        return "HEAD"
+    return _run_git(root_path, ["merge-base", base_ref, "HEAD"]).strip()
+
+
+def get_changed_files(root_path, base_ref=None):
+    """
+    Return the full paths of existing files under root_path changed since the
+    merge-base with base_ref (or HEAD), including staged, unstaged and
+    untracked files.
+    """
+    # Git reports paths relative to the top of the work tree; the "." pathspec keeps
+    # them under root_path, so stripping root_path's prefix makes them relative to it
+    prefix = get_repo_prefix(root_path)
+    changed = set()
+
+    # Working-tree status: "XY path", renames/copies are followed by the original path
+    entries = _run_git(root_path, ["status", "--porcelain=v1", "-z", "--untracked-files=all", "--", "."]).split('\0')
+    i = 0
+    while i < len(entries):
+        entry = entries[i]
+        i += 1
+        if len(entry) < 4:
+            continue
+        if entry[0] in "RC":
+            i += 1  # Skip the original path of a rename/copy
+        changed.add(entry[3:])
+
+    if base_ref:
+        names = _run_git(root_path, ["diff", "--name-only", "-z", get_diff_base(root_path, base_ref), "--", "."])
+        changed.update(name for name in names.split('\0') if name)
+
+    paths = set()
+    for name in changed:
+        if not name.startswith(prefix):
+            continue
+        path = os.path.join(root_path, os.path.normpath(name[len(prefix):]))
+        # Deleted files have nothing to show in the tree
+        if os.path.isfile(path):
+            paths.add(path)
+    return paths
+
+
+def _split_diff(output):
+    """Split the output of git diff into {repo-relative path: diff of that file}"""
+    starts = [m.start() for m in re.finditer(r'^diff --git ', output, re.M)]
+    diffs = {}
+    for start, end in zip(starts, starts[1:] + [len(output)]):
+        chunk = output[start:end]
+        # "diff --git a/<name> b/<name>"; renames are off, so both names are the same
+        names = chunk[len("diff --git a/"):chunk.find('\n')]
+        name = names[:(len(names) - len(" b/")) // 2]
+        if names == f"{name} b/{name}":
+            diffs[name] = chunk
+    return diffs
+
+
+def _untracked_file_diff(path, name):
+    """Build the diff git shows for an untracked file against an empty file, without running git"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    mode = "100755" if os.stat(path).st_mode & 0o111 else "100644"
+    header = f"diff --git a/{name} b/{name}\nnew file mode {mode}\n"
+    if not data:
+        return header
+    if b'\0' in data:
+        return header + f"Binary files /dev/null and b/{name} differ\n"
+    lines = data.decode('utf-8', errors='ignore').split('\n')
+    missing_newline = lines[-1] != ""
+    if not missing_newline:
+        lines.pop()
+    count = "1" if len(lines) == 1 else f"1,{len(lines)}"
+    diff = f"{header}--- /dev/null\n+++ b/{name}\n@@ -0,0 +{count} @@\n" + "".join(f"+{line}\n" for line in lines)
+    if missing_newline:
+        diff += "\\ No newline at end of file\n"
+    return diff
+
+
+class DiffSnapshot:
+    """
+    Diffs of every file under root_path changed since the merge-base with
+    base_ref (or HEAD), taken with a fixed number of git commands however
+    many files are asked for later. Untracked files are diffed against an
+    empty file when first asked for.
+    """
+
+    def __init__(self, root_path, base_ref=None, context_lines=3):
+        self.root_path = root_path
+        # Diff headers use paths relative to the top of the work tree, ls-files relative to root_path
+        self._prefix = get_repo_prefix(root_path)
+        tracked = _split_diff(_run_git(root_path, [
+            "-c", "core.quotePath=false", "diff", "--no-renames", "--no-color", "--no-ext-diff",
+            f"-U{context_lines}", get_diff_base(root_path, base_ref), "--", "."]))
+        self._diffs = {
+            os.path.join(root_path, os.path.normpath(name[len(self._prefix):])): diff
+            for name, diff in tracked.items() if name.startswith(self._prefix)
+        }
+        untracked = _run_git(root_path, ["ls-files", "--others", "--exclude-standard", "-z", "--", "."])
+        self._untracked = {os.path.join(root_path, os.path.normpath(name)) for name in untracked.split('\0') if name}
+
+    def get(self, path):
+        """Return the unified diff of the file at full path, or None if it is unchanged"""
+        diff = self._diffs.get(path)
+        if diff is None and path in self._untracked:
+            name = self._prefix + os.path.relpath(path, self.root_path).replace(os.sep, '/')
+            try:
+                diff = self._diffs[path] = _untracked_file_diff(path, name)
+            except OSError:
+                self._untracked.discard(path)
+        return diff
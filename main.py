@@ -1,11 +1,16 @@
 import tkinter as tk
-from tkinter import ttk, filedialog, font, messagebox
+from tkinter import ttk, filedialog, font, messagebox, simpledialog
 import os
 import threading
-import time  # 用于调试和性能分析
+import time
 
 # Import JSON-Repair tool window
 from json_repair_window import JsonRepairWindow
+from diagnostics import CountingTclProxy, PerfStats, DiagnosticsWindow
+from git_changes import DiffSnapshot, GitError, get_changed_files
+from file_tree_store import FileTreeStore
+from path_search import PathSearchIndex
+from selection_profiles import SelectionProfileWindow, load_profiles, match_profile
 
 # --- Configuration Constants (mirrors the JS project) ---
 # (常量部分保持不变)
@@ -26,6 +31,9 @@ LIKELY_TEXT_EXTENSIONS = {
     '.editorconfig', '.eslintrc', '.prettierrc', '.babelrc', 'LICENSE',
     'README', 'CHANGELOG', 'TODO', '.csv', '.tsv'
 }
+DEFAULT_SHARD_TOKENS = 100000  # Default per-shard budget when splitting a prompt
+CHARS_PER_TOKEN = 4  # Same rough estimate used by the status bar
+DEFAULT_DIFF_CONTEXT_LINES = 3  # Context lines around each changed hunk in diff mode
 
 
 # --- Main Application Class ---
@@ -42,14 +50,7 @@ class CodebaseToPromptApp(tk.Tk):
             print("Warning: 'logo.ico' not found. Using default icon.")
         self.geometry("1400x900")
 
-        # --- State Management ---
-        self.root_path = None
-        self.file_tree_data = None
-        self.file_contents = {}
-        self.selected_paths = set()
-        self.iid_map = {}  # Maps item ID to its full path
-        self.path_to_iid = {}  # OPTIMIZATION: Maps full path back to item ID
-        self.is_updating_content = False  # OPTIMIZATION: Flag to prevent concurrent updates
+        self._init_state()
 
         # --- UI Setup ---
         self._configure_styles()
@@ -60,6 +61,22 @@ class CodebaseToPromptApp(tk.Tk):
         self._update_right_pane_text("Select files from the left to generate a prompt.")
         self._update_status_bar()
 
+    def _init_state(self):
+        """初始化不依赖 Tk 的全部状态; 基准测试也用它创建无界面的实例。"""
+        self.root_path = None
+        self.file_tree_data = None  # FileTreeStore; Treeview item IDs are its node numbers as strings
+        self.file_contents = {}
+        self.selected_nodes = set()  # Selected file nodes of file_tree_data
+        self.search_index = None  # PathSearchIndex over the relative paths of file_tree_data.files
+        self.search_matches = None  # Indices into file_tree_data.files matched by the current filter
+        self.search_after_id = None
+        self.is_updating_content = False  # OPTIMIZATION: Flag to prevent concurrent updates
+        self.content_update_pending = False  # Set when the selection or settings change during an update
+        self.perf = PerfStats()  # Stage timers and counters shown in Tools > Diagnostics
+        self.file_diffs = {}  # DiffSnapshot of the root for each (base ref, context lines)
+        self.git_base_ref = ""  # Empty means the working tree against HEAD
+        self.diff_context_lines = DEFAULT_DIFF_CONTEXT_LINES
+
     def _configure_styles(self):
         self.style = ttk.Style(self)
         self.style.theme_use('clam')
@@ -95,11 +112,32 @@ class CodebaseToPromptApp(tk.Tk):
         # Tools menu
         tools_menu = tk.Menu(self, tearoff=0)
         tools_menu.add_command(label="JSON-Repair", command=self._open_json_repair)
+        tools_menu.add_command(label="Diagnostics", command=self._open_diagnostics)
         
         tools_button = ttk.Menubutton(top_bar, text="Tools")
         tools_button["menu"] = tools_menu
         tools_button.pack(side="left", padx=5)
 
+        # Git menu
+        self.emit_diffs_var = tk.BooleanVar(value=False)
+        git_menu = tk.Menu(self, tearoff=0)
+        git_menu.add_command(label="Select Changed Files", command=self._select_changed_files)
+        git_menu.add_command(label="Base Ref...", command=self._ask_git_base_ref)
+        git_menu.add_command(label="Diff Context Lines...", command=self._ask_diff_context_lines)
+        git_menu.add_separator()
+        git_menu.add_checkbutton(label="Emit Diffs Instead of Contents", variable=self.emit_diffs_var,
+                                 command=self._on_diff_settings_changed)
+
+        git_button = ttk.Menubutton(top_bar, text="Git")
+        git_button["menu"] = git_menu
+        git_button.pack(side="left", padx=5)
+
+        # Profiles menu (rebuilt every time it is opened)
+        self.profiles_menu = tk.Menu(self, tearoff=0, postcommand=self._build_profiles_menu)
+        profiles_button = ttk.Menubutton(top_bar, text="Profiles")
+        profiles_button["menu"] = self.profiles_menu
+        profiles_button.pack(side="left", padx=5)
+
         ttk.Button(top_bar, text="Expand All", command=lambda: self._toggle_all(True)).pack(side="left", padx=(20, 2))
         ttk.Button(top_bar, text="Collapse All", command=lambda: self._toggle_all(False)).pack(side="left", padx=2)
         ttk.Button(top_bar, text="Select All", command=lambda: self._select_all(True)).pack(side="left", padx=(20, 2))
@@ -110,13 +148,23 @@ class CodebaseToPromptApp(tk.Tk):
         paned_window.pack(fill="both", expand=True, padx=5, pady=5)
 
         left_frame = ttk.Frame(paned_window)
+        search_bar = ttk.Frame(left_frame)
+        ttk.Label(search_bar, text="Search:").pack(side="left")
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add("write", self._on_search_changed)
+        ttk.Entry(search_bar, textvariable=self.search_var).pack(side="left", fill="x", expand=True, padx=2)
+        ttk.Button(search_bar, text="✕", width=3, command=lambda: self.search_var.set("")).pack(side="left")
+        ttk.Button(search_bar, text="Select Matches", command=self._select_search_matches).pack(side="left", padx=2)
+
         self.tree = ttk.Treeview(left_frame, show="tree", columns=())
+        self.tree.tk = CountingTclProxy(self.tree.tk, self.perf)
         tree_scrollbar = ttk.Scrollbar(left_frame, orient="vertical", command=self.tree.yview)
         self.tree.configure(yscrollcommand=tree_scrollbar.set)
 
-        self.tree.grid(row=0, column=0, sticky="nsew")
-        tree_scrollbar.grid(row=0, column=1, sticky="ns")
-        left_frame.grid_rowconfigure(0, weight=1)
+        search_bar.grid(row=0, column=0, columnspan=2, sticky="ew", pady=(0, 5))
+        self.tree.grid(row=1, column=0, sticky="nsew")
+        tree_scrollbar.grid(row=1, column=1, sticky="ns")
+        left_frame.grid_rowconfigure(1, weight=1)
         left_frame.grid_columnconfigure(0, weight=1)
 
         self.tree.tag_configure("unchecked", image=self.img_unchecked)
@@ -129,11 +177,20 @@ class CodebaseToPromptApp(tk.Tk):
         right_header.pack(fill="x", pady=(0, 5))
         ttk.Label(right_header, text="Selected Files", font=("Segoe UI", 12, "bold")).pack(side="left")
         ttk.Button(right_header, text="Copy to Clipboard", command=self._copy_to_clipboard).pack(side="right")
+        ttk.Button(right_header, text="Export Shards...", command=self._export_shards).pack(side="right", padx=(5, 10))
+        ttk.Button(right_header, text="Copy Shard", command=self._copy_shard).pack(side="right", padx=2)
+        self.shard_index_var = tk.StringVar(value="1")
+        ttk.Spinbox(right_header, from_=1, to=9999, width=5, textvariable=self.shard_index_var).pack(side="right")
+        ttk.Label(right_header, text="Shard #").pack(side="right", padx=(10, 2))
+        self.shard_tokens_var = tk.StringVar(value=str(DEFAULT_SHARD_TOKENS))
+        ttk.Entry(right_header, width=9, textvariable=self.shard_tokens_var).pack(side="right")
+        ttk.Label(right_header, text="Tokens/Shard:").pack(side="right", padx=(10, 2))
 
         text_container = ttk.Frame(right_frame)
         text_container.pack(fill="both", expand=True)
         self.text_area = tk.Text(text_container, wrap="none", font=("Consolas", 10), state="disabled", borderwidth=0,
                                  highlightthickness=0, bg="#fdfdfd")
+        self.text_area.tk = CountingTclProxy(self.text_area.tk, self.perf)
         v_scroll = ttk.Scrollbar(text_container, orient="vertical", command=self.text_area.yview)
         h_scroll = ttk.Scrollbar(text_container, orient="horizontal", command=self.text_area.xview)
         self.text_area.configure(yscrollcommand=v_scroll.set, xscrollcommand=h_scroll.set)
@@ -156,7 +213,11 @@ class CodebaseToPromptApp(tk.Tk):
             "1. Click 'Select Directory' to choose your project folder.\n"
             "2. Check/uncheck files and directories on the left.\n"
             "3. The generated prompt text will appear on the right.\n"
-            "4. Click 'Copy to Clipboard' to copy the text.\n\n"
+            "4. Click 'Copy to Clipboard' to copy the text.\n"
+            "5. For selections larger than one context window, set 'Tokens/Shard'\n"
+            "   and use 'Copy Shard' or 'Export Shards...'.\n"
+            "6. Use 'Git > Select Changed Files' to pick files touched on a branch;\n"
+            "   enable 'Emit Diffs Instead of Contents' for review prompts.\n\n"
             "This tool helps you create a single text block from your codebase, "
             "perfect for pasting into Large Language Models (LLMs) like GPT or Claude.\n\n"
             "Author: Tianhc, tianhc@126.com\n"
@@ -173,6 +234,30 @@ class CodebaseToPromptApp(tk.Tk):
         """Open JSON-Repair tool window"""
         JsonRepairWindow(self)
 
+    def _open_diagnostics(self):
+        """Open the diagnostics panel with per-stage timings and counters"""
+        DiagnosticsWindow(self, self.perf)
+
+    def _build_profiles_menu(self):
+        self.profiles_menu.delete(0, "end")
+        if not self.root_path:
+            self.profiles_menu.add_command(label="Select a directory first", state="disabled")
+            return
+        self.profiles_menu.add_command(label="Manage Profiles...", command=self._open_selection_profiles)
+        profiles = load_profiles(self.root_path)
+        if profiles:
+            self.profiles_menu.add_separator()
+            for name in sorted(profiles):
+                self.profiles_menu.add_command(
+                    label=f"Apply '{name}'",
+                    command=lambda profile=profiles[name]: self._apply_selection_profile(profile))
+
+    def _open_selection_profiles(self):
+        if not self.root_path:
+            return
+        SelectionProfileWindow(self, self.root_path, self._get_selected_relative_paths,
+                               self._apply_selection_profile)
+
     # --- Event Handlers and Core Logic ---
 
     def _on_select_directory(self):
@@ -189,33 +274,40 @@ class CodebaseToPromptApp(tk.Tk):
         MAX_FILES_THRESHOLD = 10000
         file_count = 0
         try:
-            for dirpath, dirnames, filenames in os.walk(self.root_path, topdown=True):
-                dirnames[:] = [d for d in dirnames if d not in IGNORED_DIRECTORIES]
-                valid_files = [f for f in filenames if not any(
-                    f.lower().endswith(ext) for ext in IGNORED_FILES if ext.startswith('.')) and f not in IGNORED_FILES]
-                file_count += len(valid_files)
-                if file_count > MAX_FILES_THRESHOLD:
-                    self.after(0, lambda: messagebox.showerror(
-                        "Too Many Files",
-                        f"The selected directory contains over {MAX_FILES_THRESHOLD} files.\n\nPlease select a smaller, more specific project folder to avoid performance issues."
-                    ))
-                    self.after(0, self._clear_all)
-                    return
+            with self.perf.stage("prescan"):
+                for dirpath, dirnames, filenames in os.walk(self.root_path, topdown=True):
+                    dirnames[:] = [d for d in dirnames if d not in IGNORED_DIRECTORIES]
+                    valid_files = [f for f in filenames if not any(
+                        f.lower().endswith(ext) for ext in IGNORED_FILES if ext.startswith('.')) and f not in IGNORED_FILES]
+                    file_count += len(valid_files)
+                    if file_count > MAX_FILES_THRESHOLD:
+                        self.after(0, lambda: messagebox.showerror(
+                            "Too Many Files",
+                            f"The selected directory contains over {MAX_FILES_THRESHOLD} files.\n\nPlease select a smaller, more specific project folder to avoid performance issues."
+                        ))
+                        self.after(0, self._clear_all)
+                        return
         except Exception as e:
             self.after(0, lambda: messagebox.showerror("Error", f"An error occurred during pre-scan: {e}"))
             self.after(0, self._clear_all)
             return
 
-        self.file_tree_data = self._scan_directory(self.root_path)
+        with self.perf.stage("scan_directory"):
+            self.file_tree_data = self._scan_directory(self.root_path)
         self.after(0, self._populate_tree)
 
     def _clear_all(self):
         self.root_path = None
         self.file_tree_data = None
         self.file_contents = {}
-        self.selected_paths = set()
-        self.iid_map = {}
-        self.path_to_iid = {}
+        self.file_diffs = {}
+        self.selected_nodes = set()
+        self.search_index = None
+        self.search_matches = None
+        if self.search_after_id:
+            self.after_cancel(self.search_after_id)
+            self.search_after_id = None
+        self.search_var.set("")
         self.tree.delete(*self.tree.get_children())
         self._update_right_pane_text("Select files from the left to generate a prompt.")
         self._update_status_bar()
@@ -244,46 +336,217 @@ class CodebaseToPromptApp(tk.Tk):
         if not iid:
             return
 
-        is_dir = bool(self.tree.get_children(iid))
+        node = int(iid)
         current_tag = self.tree.item(iid, "tags")[0]
         select_action = current_tag == "unchecked" or current_tag == "tristate"
 
-        if is_dir:
+        if self.file_tree_data.is_dir[node]:
             self._update_descendants_check_state(iid, select_action)
         else:
-            path = self.iid_map.get(iid)
-            if path:
-                if select_action:
-                    self.selected_paths.add(path)
-                else:
-                    self.selected_paths.discard(path)
-                self.tree.item(iid, tags=("checked" if select_action else "unchecked",))
+            if select_action:
+                self.selected_nodes.add(node)
+            else:
+                self.selected_nodes.discard(node)
+            self.tree.item(iid, tags=("checked" if select_action else "unchecked",))
 
         self._update_ancestors_check_state(iid)
         self._trigger_content_update()
     # --- END OF FIX ---
 
+    def _tree_ready(self):
+        """True once file_tree_data has been inserted into the Treeview"""
+        return self.file_tree_data is not None and self.tree.exists("0")
+
     def _toggle_all(self, expand=True):
-        for iid in self.iid_map:
-            if self.tree.exists(iid):
-                self.tree.item(iid, open=expand)
+        if not self._tree_ready(): return
+        for node in range(len(self.file_tree_data)):
+            self.tree.item(str(node), open=expand)
 
     def _select_all(self, select=True):
-        if not self.root_path: return
+        if not self.root_path or not self._tree_ready(): return
 
         if select:
-            all_files = {path for iid, path in self.iid_map.items() if not self.tree.get_children(iid)}
-            self.selected_paths = all_files
+            self.selected_nodes = set(self.file_tree_data.files)
         else:
-            self.selected_paths.clear()
+            self.selected_nodes.clear()
 
         new_tag = "checked" if select else "unchecked"
-        for iid in self.iid_map:
-            if self.tree.exists(iid):
-                self.tree.item(iid, tags=(new_tag,))
+        for node in range(len(self.file_tree_data)):
+            self.tree.item(str(node), tags=(new_tag,))
 
         self._trigger_content_update()
 
+    def _apply_selection_profile(self, profile):
+        """
+        应用选择配置: 在索引好的文件路径列表上一次性匹配, 然后统一刷新复选框状态,
+        而不是逐个模拟点击。
+        """
+        if not self.root_path or not self._tree_ready():
+            return
+        files = self.file_tree_data.files
+        matched = match_profile(profile, self.file_tree_data.relative_file_paths())
+        self.selected_nodes = {files[i] for i in matched}
+        self._refresh_check_states()
+        self._trigger_content_update()
+
+    def _get_selected_relative_paths(self):
+        return sorted(self.file_tree_data.relative_path(node) for node in self.selected_nodes)
+
+    def _get_selected_paths(self):
+        """Full paths of the selected files, rebuilt from the tree store and sorted"""
+        return sorted(self.file_tree_data.path(node) for node in self.selected_nodes)
+
+    # --- Path Search ---
+
+    def _on_search_changed(self, *args):
+        # Debounce: only filter once typing pauses briefly
+        if self.search_after_id:
+            self.after_cancel(self.search_after_id)
+        self.search_after_id = self.after(150, self._apply_search_filter)
+
+    def _apply_search_filter(self):
+        """
+        用预建的路径索引过滤文件树: 只显示匹配的文件及其祖先目录。
+        通过 set_children 重新挂接子节点, 被过滤掉的节点只是被分离(detach)而不是删除。
+        """
+        self.search_after_id = None
+        if not self.search_index or not self._tree_ready():
+            return
+
+        query = self.search_var.get().strip()
+        if not query:
+            if self.search_matches is not None:
+                self.search_matches = None
+                self._restore_tree_children()
+                self._update_status_bar()
+            return
+
+        with self.perf.stage("search_index"):
+            matches = self.search_index.search(query)
+        self.search_matches = matches
+
+        # Every ancestor directory of a matched file stays visible
+        store = self.file_tree_data
+        parent = store.parent
+        visible = {0}
+        for i in matches:
+            node = store.files[i]
+            while node not in visible:
+                visible.add(node)
+                node = parent[node]
+
+        def _filter(node):
+            visible_children = [child for child in store.children(node) if child in visible]
+            self.tree.set_children(str(node), *(str(child) for child in visible_children))
+            self.tree.item(str(node), open=True)
+            for child in visible_children:
+                if store.is_dir[child]:
+                    _filter(child)
+
+        with self.perf.stage("search_filter_tree"):
+            _filter(0)
+        self.status_label.config(text=f"Search: {len(matches):,} matching file(s) | Selected Files: {len(self.selected_nodes)}")
+
+    def _restore_tree_children(self):
+        store = self.file_tree_data
+        for node in range(len(store)):
+            if store.is_dir[node]:
+                self.tree.set_children(str(node), *(str(child) for child in store.children(node)))
+        # Clicks made while filtered only saw the visible children; recompute from the selection set
+        self._refresh_check_states()
+
+    def _select_search_matches(self):
+        if not self.search_matches:
+            return
+        files = self.file_tree_data.files
+        self.selected_nodes.update(files[i] for i in self.search_matches)
+        self._refresh_check_states()
+        self._trigger_content_update()
+
+    # --- Git Integration ---
+
+    def _select_changed_files(self):
+        if not self.root_path:
+            return
+        self.status_label.config(text="Reading git status...")
+        threading.Thread(
+            target=self._load_changed_files_in_background,
+            args=(self.root_path, self.git_base_ref),
+            daemon=True
+        ).start()
+
+    def _load_changed_files_in_background(self, root_path, base_ref):
+        try:
+            with self.perf.stage("git_status"):
+                changed = get_changed_files(root_path, base_ref or None)
+        except GitError as e:
+            self.after(0, lambda e=e: messagebox.showerror("Git Error", f"Could not read git changes:\n\n{e}"))
+            self.after(0, self._update_status_bar)
+            return
+        self.after(0, self._apply_changed_files, root_path, changed)
+
+    def _apply_changed_files(self, root_path, changed):
+        if root_path != self.root_path or not self._tree_ready():
+            return
+        # Only files shown in the tree can be selected (ignored and binary files are skipped)
+        store = self.file_tree_data
+        self.selected_nodes = {node for node in store.files if store.path(node) in changed}
+        self.file_diffs = {}
+        self.file_contents = {}  # Changed files may have been edited since they were cached
+        self._refresh_check_states()
+        if not self.selected_nodes:
+            self._update_right_pane_text("No changed files found.")
+            self._update_status_bar()
+            return
+        self._trigger_content_update()
+
+    def _ask_git_base_ref(self):
+        base_ref = simpledialog.askstring(
+            "Base Ref",
+            "Compare against this branch, tag or commit\n(leave empty for uncommitted changes against HEAD):",
+            initialvalue=self.git_base_ref, parent=self)
+        if base_ref is None:
+            return
+        self.git_base_ref = base_ref.strip()
+        self._on_diff_settings_changed()
+
+    def _ask_diff_context_lines(self):
+        lines = simpledialog.askinteger(
+            "Diff Context Lines", "Unchanged lines to show around each change:",
+            initialvalue=self.diff_context_lines, minvalue=0, maxvalue=10000, parent=self)
+        if lines is None:
+            return
+        self.diff_context_lines = lines
+        self._on_diff_settings_changed()
+
+    def _on_diff_settings_changed(self):
+        if self.selected_nodes:
+            self._trigger_content_update()
+
+    def _get_diff_options(self):
+        """(base ref, context lines) when diff mode is on, otherwise None; call from the Tk thread"""
+        if self.emit_diffs_var.get():
+            return (self.git_base_ref, self.diff_context_lines)
+        return None
+
+    def _read_file_diffs(self, paths, base_ref, context_lines):
+        """
+        返回 {path: unified diff}; 文件未改动时对应值为 None。
+        每组 (base ref, context lines) 只对整个根目录批量运行一次 git, 结果全部缓存。
+        git 失败时抛出 GitError, 且不缓存任何结果, 下次会重试。
+        """
+        key = (base_ref, context_lines)
+        snapshot = self.file_diffs.get(key)
+        if snapshot is None:
+            snapshot = DiffSnapshot(self.root_path, base_ref or None, context_lines)
+            self.file_diffs[key] = snapshot
+            self.perf.incr("diff_snapshots")
+        return {path: snapshot.get(path) for path in paths}
+
+    def _show_diff_error(self, error, consequence):
+        self._update_status_bar()
+        messagebox.showerror("Git Error", f"Could not read git diffs; {consequence}:\n\n{error}")
+
     def _copy_to_clipboard(self):
         content = self.text_area.get("1.0", "end-1c")
         if content and content != "Loading...":
@@ -295,9 +558,128 @@ class CodebaseToPromptApp(tk.Tk):
             except tk.TclError:
                 messagebox.showwarning("Copy Failed", "Could not copy content to clipboard. It might be too large.")
 
+    def _get_shard_budget_chars(self):
+        try:
+            tokens = int(self.shard_tokens_var.get())
+        except ValueError:
+            tokens = 0
+        if tokens <= 0:
+            messagebox.showerror("Invalid Budget", "Tokens/Shard must be a positive whole number.")
+            return None
+        return tokens * CHARS_PER_TOKEN
+
+    def _copy_shard(self):
+        if not self.selected_nodes:
+            return
+        budget_chars = self._get_shard_budget_chars()
+        if budget_chars is None:
+            return
+        try:
+            index = int(self.shard_index_var.get())
+        except ValueError:
+            index = 0
+
+        self.status_label.config(text=f"Preparing shard {index}...")
+        threading.Thread(
+            target=self._prepare_shard_in_background,
+            args=(self._get_selected_paths(), budget_chars, index, self._get_diff_options()),
+            daemon=True
+        ).start()
+
+    def _prepare_shard_in_background(self, sorted_paths, budget_chars, index, diff_options=None):
+        try:
+            diffs = self._read_file_diffs(sorted_paths, *diff_options) if diff_options else None
+        except GitError as e:
+            self.after(0, self._show_diff_error, e, "no shard was copied")
+            return
+        try:
+            plan = self._plan_prompt_shards(sorted_paths, budget_chars, diffs)
+        except ValueError as e:
+            self.after(0, self._show_budget_error, e)
+            return
+        if not 1 <= index <= len(plan):
+            self.after(0, self._on_shard_missing, len(plan))
+            return
+        # Only the requested shard is rendered; the others are never built.
+        content = self._render_prompt_shard(plan[index - 1], index, len(plan), diffs)
+        self.after(0, self._on_shard_ready, content, index, len(plan))
+
+    def _show_budget_error(self, error):
+        self._update_status_bar()
+        messagebox.showerror("Invalid Budget", str(error))
+
+    def _on_shard_missing(self, total):
+        self._update_status_bar()
+        messagebox.showwarning("No Such Shard", f"The current selection has {total} shard(s).")
+
+    def _on_shard_ready(self, content, index, total):
+        try:
+            self.clipboard_clear()
+            self.clipboard_append(content)
+            self.update()
+            tokens = (len(content) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+            self.status_label.config(text=f"Copied shard {index} of {total} (~{tokens:,} tokens) to clipboard!")
+        except tk.TclError:
+            messagebox.showwarning("Copy Failed", "Could not copy content to clipboard. It might be too large.")
+
+    def _export_shards(self):
+        if not self.selected_nodes:
+            return
+        budget_chars = self._get_shard_budget_chars()
+        if budget_chars is None:
+            return
+        out_dir = filedialog.askdirectory(title="Export Shards To")
+        if not out_dir:
+            return
+        self.status_label.config(text="Exporting shards...")
+        threading.Thread(
+            target=self._export_shards_in_background,
+            args=(self._get_selected_paths(), budget_chars, out_dir, self._get_diff_options()),
+            daemon=True
+        ).start()
+
+    def _export_shards_in_background(self, sorted_paths, budget_chars, out_dir, diff_options=None):
+        try:
+            diffs = self._read_file_diffs(sorted_paths, *diff_options) if diff_options else None
+        except GitError as e:
+            self.after(0, self._show_diff_error, e, "no shards were exported")
+            return
+        try:
+            plan = self._plan_prompt_shards(sorted_paths, budget_chars, diffs)
+        except ValueError as e:
+            self.after(0, self._show_budget_error, e)
+            return
+        count = 0
+        try:
+            # A fresh directory per export, so shards from an earlier, longer export can't mix in
+            out_dir = self._make_export_dir(out_dir)
+            for index, shard_text in enumerate(self._iter_prompt_shards(plan, diffs), start=1):
+                shard_path = os.path.join(out_dir, f"prompt_shard_{index:03d}.txt")
+                with open(shard_path, 'w', encoding='utf-8') as f:
+                    f.write(shard_text)
+                count = index
+        except OSError as e:
+            self.after(0, lambda e=e: messagebox.showerror("Export Failed", f"Could not write shard: {e}"))
+            return
+        self.after(0, lambda: self.status_label.config(text=f"Exported {count} shard(s) to {out_dir}"))
+
+    def _make_export_dir(self, parent_dir):
+        """在 parent_dir 下新建一个以时间命名的子目录并返回其路径。"""
+        base = os.path.join(parent_dir, time.strftime("prompt_shards_%Y%m%d_%H%M%S"))
+        path = base
+        suffix = 1
+        while True:
+            try:
+                os.makedirs(path)
+                return path
+            except FileExistsError:
+                suffix += 1
+                path = f"{base}_{suffix}"
+
     # --- Data Processing and Population ---
 
     def _is_text_likely(self, filepath):
+        self.perf.incr("text_sniffs")
         try:
             with open(filepath, 'rb') as f:
                 chunk = f.read(4096)
@@ -311,16 +693,14 @@ class CodebaseToPromptApp(tk.Tk):
             return False
 
     def _scan_directory(self, root_path):
-        tree = {'name': os.path.basename(root_path), 'path': root_path, 'is_dir': True, 'children': []}
-        path_map = {root_path: tree}
+        tree = FileTreeStore(root_path)
+        dir_nodes = {root_path: 0}  # Only needed while walking
+        bytes_scanned = 0
         for dirpath, dirnames, filenames in os.walk(root_path, topdown=True):
             dirnames[:] = [d for d in dirnames if d not in IGNORED_DIRECTORIES]
-            parent_node = path_map[dirpath]
+            parent_node = dir_nodes.pop(dirpath)
             for dirname in sorted(dirnames):
-                path = os.path.join(dirpath, dirname)
-                node = {'name': dirname, 'path': path, 'is_dir': True, 'children': []}
-                parent_node['children'].append(node)
-                path_map[path] = node
+                dir_nodes[os.path.join(dirpath, dirname)] = tree.add_dir(parent_node, dirname)
             for filename in sorted(filenames):
                 is_ignored = any(filename.lower().endswith(ext) for ext in IGNORED_FILES if
                                  ext.startswith('.')) or filename in IGNORED_FILES
@@ -331,37 +711,36 @@ class CodebaseToPromptApp(tk.Tk):
                         filename.lower().endswith(ext) for ext in LIKELY_TEXT_EXTENSIONS) or self._is_text_likely(
                         path)
                     if is_text:
-                        node = {'name': filename, 'path': path, 'is_dir': False, 'size': os.path.getsize(path)}
-                        parent_node['children'].append(node)
+                        size = os.path.getsize(path)
+                        tree.add_file(parent_node, filename, size)
+                        bytes_scanned += size
                 except (IOError, OSError):
                     # Skip files that can't be accessed (e.g. permission denied)
                     continue
+
+        tree.finish()
+        self.search_index = PathSearchIndex(tree.relative_file_paths())
+        self.perf.incr("files_scanned", len(tree.files))
+        self.perf.incr("bytes_scanned", bytes_scanned)
         return tree
 
     def _populate_tree(self):
         self.tree.delete(*self.tree.get_children())
-        self.iid_map.clear()
-        self.path_to_iid.clear()
-
-        def _insert(node, parent_iid=""):
-            name = node['name']
-            path = node['path']
-            if not node['is_dir']:
-                size_str = f" ({self._format_size(node.get('size', 0))})"
-                display_text = f"📄 {name}{size_str}"
-            else:
-                display_text = f"📁 {name}"
 
-            iid = self.tree.insert(parent_iid, "end", text=display_text, open=True, tags=("unchecked",))
-            self.iid_map[iid] = path
-            self.path_to_iid[path] = iid
-
-            if node.get('is_dir'):
-                for child in node.get('children', []):
-                    _insert(child, iid)
-
-        if self.file_tree_data:
-            _insert(self.file_tree_data)
+        store = self.file_tree_data
+        if store:
+            with self.perf.stage("populate_tree"):
+                # Parents always precede their children and siblings are contiguous,
+                # so inserting in node order reproduces the tree without recursion
+                for node in range(len(store)):
+                    name = store.name(node)
+                    if not store.is_dir[node]:
+                        display_text = f"📄 {name} ({self._format_size(store.size[node])})"
+                    else:
+                        display_text = f"📁 {name}"
+                    parent_iid = str(store.parent[node]) if node else ""
+                    self.tree.insert(parent_iid, "end", iid=str(node), text=display_text, open=True,
+                                     tags=("unchecked",))
             self._update_status_bar()
             self.status_label.config(text=f"Loaded {self.root_path}")
 
@@ -373,14 +752,12 @@ class CodebaseToPromptApp(tk.Tk):
         self.tree.item(iid, tags=(new_tag,))
 
         for child_iid in children:
-            path = self.iid_map.get(child_iid)
-            if not path: continue
-
-            if not self.tree.get_children(child_iid):
+            node = int(child_iid)
+            if not self.file_tree_data.is_dir[node]:
                 if select:
-                    self.selected_paths.add(path)
+                    self.selected_nodes.add(node)
                 else:
-                    self.selected_paths.discard(path)
+                    self.selected_nodes.discard(node)
                 self.tree.item(child_iid, tags=(new_tag,))
             else:
                 self._update_descendants_check_state(child_iid, select)
@@ -388,7 +765,9 @@ class CodebaseToPromptApp(tk.Tk):
     def _update_ancestors_check_state(self, iid):
         parent_iid = self.tree.parent(iid)
         while parent_iid:
-            children = self.tree.get_children(parent_iid)
+            # Directories without any file below them can't be selected and don't count
+            has_files = self.file_tree_data.has_files
+            children = [child_iid for child_iid in self.tree.get_children(parent_iid) if has_files[int(child_iid)]]
             if not children:
                 self.tree.item(parent_iid, tags=("unchecked",))
                 parent_iid = self.tree.parent(parent_iid)
@@ -412,66 +791,123 @@ class CodebaseToPromptApp(tk.Tk):
 
             parent_iid = self.tree.parent(parent_iid)
 
+    def _refresh_check_states(self):
+        """根据 selected_nodes 一次性重新计算整棵树的复选框状态。"""
+        store = self.file_tree_data
+        if not self._tree_ready():
+            return
+
+        tags = ("unchecked", "checked", "tristate")
+        count = len(store)
+        parent, is_dir, has_files = store.parent, store.is_dir, store.has_files
+        num_selectable = [0] * count  # Children of each directory with at least one file at or below them
+        num_checked = [0] * count  # Selectable children that are checked
+        num_marked = [0] * count  # Selectable children that are checked or tristate
+
+        with self.perf.stage("refresh_check_states"):
+            # Children always have larger node numbers than their parent, so a
+            # reverse pass finishes every directory's children before the directory
+            for node in range(count - 1, -1, -1):
+                if not is_dir[node]:
+                    state = 1 if node in self.selected_nodes else 0
+                elif num_selectable[node] and num_checked[node] == num_selectable[node]:
+                    state = 1
+                elif num_marked[node]:
+                    state = 2
+                else:
+                    state = 0
+                self.tree.item(str(node), tags=(tags[state],))
+                if not node or not has_files[node]:
+                    continue
+                num_selectable[parent[node]] += 1
+                if state:
+                    num_marked[parent[node]] += 1
+                    if state == 1:
+                        num_checked[parent[node]] += 1
+
     def _trigger_content_update(self):
         if self.is_updating_content:
+            # Run again once the current update finishes, so the result reflects the latest state
+            self.content_update_pending = True
             return
 
         self.is_updating_content = True
 
         self._update_right_pane_text("Loading...")
-        count = len(self.selected_paths)
+        count = len(self.selected_nodes)
         self.status_label.config(text=f"Selected Files: {count} | Estimated Tokens: Calculating...")
         self.update_idletasks()
 
-        paths_to_process = self.selected_paths.copy()
-
+        paths_to_process = self._get_selected_paths()
         threading.Thread(
             target=self._load_content_in_background,
-            args=(paths_to_process,),
+            args=(paths_to_process, self._get_diff_options()),
             daemon=True
         ).start()
 
-    def _load_content_in_background(self, paths):
+    def _load_content_in_background(self, paths, diff_options=None):
         local_file_contents = {}
+        diff_paths = set()
         total_chars = 0
 
         sorted_paths = sorted(list(paths))
 
-        for path in sorted_paths:
-            if path in self.file_contents:
-                content = self.file_contents[path]
-            else:
-                try:
-                    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                    self.file_contents[path] = content
-                except Exception:
-                    content = f"Error reading file: {os.path.basename(path)}"
-
-            local_file_contents[path] = content
-            total_chars += len(content)
+        with self.perf.stage("read_files"):
+            try:
+                diffs = self._read_file_diffs(sorted_paths, *diff_options) if diff_options else {}
+            except GitError as e:
+                self.after(0, self._show_diff_error, e, "showing full file contents instead")
+                diffs = {}
+            for path in sorted_paths:
+                # Changed files contribute only their diff; the file itself is never read
+                content = diffs.get(path)
+                if content is not None:
+                    diff_paths.add(path)
+                else:
+                    content = self._read_file_content(path)
+                local_file_contents[path] = content
+                total_chars += len(content)
 
-        prompt_text = self._generate_prompt_text(sorted_paths, local_file_contents)
+        with self.perf.stage("generate_prompt"):
+            prompt_text = self._generate_prompt_text(sorted_paths, local_file_contents, diff_paths)
         self.after(0, self._on_content_update_complete, prompt_text, len(paths), total_chars)
 
+    def _read_file_content(self, path):
+        if path in self.file_contents:
+            self.perf.incr("cache_hits")
+            return self.file_contents[path]
+        try:
+            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                content = f.read()
+            self.file_contents[path] = content
+            self.perf.incr("files_read")
+            self.perf.incr("chars_read", len(content))
+            return content
+        except Exception:
+            return f"Error reading file: {os.path.basename(path)}"
+
     def _on_content_update_complete(self, prompt_text, count, total_chars):
         self._update_right_pane_text(prompt_text)
         tokens = (total_chars + 3) // 4
         self.status_label.config(
             text=f"Selected Files: {count} | Estimated Tokens: ~{tokens:,} | Total Chars: {total_chars:,}")
         self.is_updating_content = False
+        if self.content_update_pending:
+            self.content_update_pending = False
+            self._trigger_content_update()
 
     def _update_right_pane_text(self, text):
-        self.text_area.config(state="normal")
-        self.text_area.delete("1.0", "end")
-        self.text_area.insert("1.0", text)
-        self.text_area.config(state="disabled")
+        with self.perf.stage("update_right_pane"):
+            self.text_area.config(state="normal")
+            self.text_area.delete("1.0", "end")
+            self.text_area.insert("1.0", text)
+            self.text_area.config(state="disabled")
 
     def _update_status_bar(self):
-        count = len(self.selected_paths)
+        count = len(self.selected_nodes)
         self.status_label.config(text=f"Selected Files: {count}")
 
-    def _generate_prompt_text(self, selected_paths, file_contents):
+    def _generate_prompt_text(self, selected_paths, file_contents, diff_paths=()):
         if not selected_paths:
             return "Select files from the left to generate a prompt."
 
@@ -480,11 +916,148 @@ class CodebaseToPromptApp(tk.Tk):
         doc_blocks = []
         for path in selected_paths:  # Already sorted from the calling function
             content = file_contents.get(path, "")
-            relative_path = os.path.relpath(path, os.path.dirname(self.root_path))
-            doc_blocks.append(f'<document path="{relative_path}">\n{content}\n</document>')
+            doc_blocks.append(self._format_document_block(path, content, is_diff=path in diff_paths))
 
         return f"<folder-structure>\n{structure_str}\n</folder-structure>\n\n" + "\n\n".join(doc_blocks)
 
+    def _format_document_block(self, path, content, part=1, part_count=1, is_diff=False):
+        relative_path = os.path.relpath(path, os.path.dirname(self.root_path))
+        type_attr = ' type="diff"' if is_diff else ""
+        part_attr = f' part="{part}/{part_count}"' if part_count > 1 else ""
+        return f'<document path="{relative_path}"{type_attr}{part_attr}>\n{content}\n</document>'
+
+    # --- Prompt Sharding ---
+
+    def _plan_prompt_shards(self, sorted_paths, budget_chars, diffs=None):
+        """
+        把有序的文档流切分为若干分片, 每个分片渲染后不超过 budget_chars 个字符。
+        规划阶段只使用文件大小, 不读取文件内容; 只有单个文件本身超出预算时
+        才会读取它并按行切分。diffs 为 {path: diff 或 None} 时, 有 diff 的文件
+        以 diff 代替完整内容。返回分片列表, 每个分片是
+        (path, start, end, part, part_count) 片段的列表。
+        如果某个分片留给内容的空间小于它自身的固定开销(标题、目录结构、标签),
+        则抛出 ValueError, 而不是切出大量几乎没有内容的分片。
+        """
+        # The shard header holds the shard count, so plan again if it needs more digits
+        digits = 1
+        while True:
+            shards = self._pack_prompt_shards(sorted_paths, budget_chars, digits, diffs or {})
+            if len(str(len(shards))) <= digits:
+                return shards
+            digits = len(str(len(shards)))
+
+    def _pack_prompt_shards(self, sorted_paths, budget_chars, total_digits, diffs):
+        root_parent = os.path.dirname(self.root_path)
+        # Shard header, folder-structure wrapper and the root line of the tree
+        base = (len(f"<!-- Shard {'9' * total_digits} of {'9' * total_digits} -->\n")
+                + len("<folder-structure>\n\n</folder-structure>\n\n") + len(os.path.basename(self.root_path)))
+        doc_tags = len('<document path="">\n\n</document>')
+        shards = []
+        current = []
+        used = base
+        tree_dirs = set()  # Directory lines already in the current shard's folder structure
+
+        for path in sorted_paths:
+            relative_path = os.path.relpath(path, root_parent)
+            parts = relative_path.split(os.sep)
+            dirs = [os.sep.join(parts[:depth + 1]) for depth in range(1, len(parts) - 1)]
+
+            def tree_cost(known_dirs):
+                # A line at depth d is its "│   "/"├── " prefixes (4 chars per level), the name and a newline
+                cost = 4 * (len(parts) - 1) + len(parts[-1]) + 1
+                for depth, directory in enumerate(dirs, start=1):
+                    if directory not in known_dirs:
+                        cost += 4 * depth + len(parts[depth]) + 1
+                return cost
+
+            diff = diffs.get(path)
+            tags = doc_tags + len(relative_path) + (len(' type="diff"') if diff is not None else 0)
+            overhead = base + tree_cost(()) + tags
+            if 2 * overhead > budget_chars:
+                min_tokens = (2 * overhead + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+                raise ValueError(
+                    f"Tokens/Shard is too small: a shard with {relative_path} needs {overhead:,} characters "
+                    f"for its header and folder structure alone. Use at least {min_tokens:,} tokens.")
+            doc_cost = tags + (len(diff) if diff is not None else self._prompt_content_length(path))
+            if base + tree_cost(()) + doc_cost > budget_chars:
+                content = diff if diff is not None else self._read_file_content(path)
+                ranges = self._split_content_ranges_within(content, budget_chars - base - tree_cost(()) - tags)
+                if len(ranges) > 1:
+                    if current:
+                        shards.append(current)
+                        current, used, tree_dirs = [], base, set()
+                    for part, (start, end) in enumerate(ranges, start=1):
+                        shards.append([(path, start, end, part, len(ranges))])
+                    continue
+                doc_cost = tags + len(content)
+
+            cost = tree_cost(tree_dirs) + doc_cost + (2 if current else 0)
+            if current and used + cost > budget_chars:
+                shards.append(current)
+                current, used, tree_dirs = [], base, set()
+                cost = tree_cost(tree_dirs) + doc_cost
+            current.append((path, None, None, 1, 1))
+            used += cost
+            tree_dirs.update(dirs)
+
+        if current:
+            shards.append(current)
+        return shards
+
+    def _prompt_content_length(self, path):
+        """文件内容字符数的上限: 已缓存时精确, 否则用字节数(解码后的字符数不会超过字节数)。"""
+        if path in self.file_contents:
+            return len(self.file_contents[path])
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return len(self._read_file_content(path))
+
+    def _split_content_ranges_within(self, content, limit):
+        """按 limit 切分内容, 并为各片段的 part="i/n" 属性留出空间。"""
+        digits = 1
+        while True:
+            ranges = self._split_content_ranges(content, limit - len(f' part="{"9" * digits}/{"9" * digits}"'))
+            if len(ranges) == 1 or len(str(len(ranges))) <= digits:
+                return ranges
+            digits = len(str(len(ranges)))
+
+    def _split_content_ranges(self, content, limit):
+        """按行边界把内容切分为不超过 limit 个字符的 (start, end) 区间, 超长的单行会被硬切分。"""
+        limit = max(limit, 1)
+        ranges = []
+        start = 0
+        length = len(content)
+        while start < length:
+            end = min(start + limit, length)
+            if end < length:
+                newline = content.rfind('\n', start, end)
+                if newline >= start:
+                    end = newline + 1
+            ranges.append((start, end))
+            start = end
+        return ranges or [(0, 0)]
+
+    def _render_prompt_shard(self, segments, index, total, diffs=None):
+        paths = list(dict.fromkeys(segment[0] for segment in segments))
+        structure_str = self._generate_ascii_tree(paths)
+
+        doc_blocks = []
+        for path, start, end, part, part_count in segments:
+            diff = diffs.get(path) if diffs else None
+            content = diff if diff is not None else self._read_file_content(path)
+            if start is not None:
+                content = content[start:end]
+            doc_blocks.append(self._format_document_block(path, content, part, part_count, is_diff=diff is not None))
+
+        return (f"<!-- Shard {index} of {total} -->\n"
+                f"<folder-structure>\n{structure_str}\n</folder-structure>\n\n" + "\n\n".join(doc_blocks))
+
+    def _iter_prompt_shards(self, plan, diffs=None):
+        """惰性生成分片文本: 仅在迭代到某个分片时才读取并拼接它的内容。"""
+        for index, segments in enumerate(plan, start=1):
+            yield self._render_prompt_shard(segments, index, len(plan), diffs)
+
     def _generate_ascii_tree(self, selected_paths):
         if not self.root_path or not selected_paths:
             return ""
@@ -0,0 +1,162 @@
+import operator
+import re
+from array import array
+from itertools import compress, repeat
+
+# bytes.translate tables between 0/1 flag bytes and the '0'/'1' digits of a binary number
+_FLAGS_TO_DIGITS = bytes.maketrans(b'\x00\x01', b'01')
+_DIGITS_TO_FLAGS = bytes.maketrans(b'01', b'\x00\x01')
+
+
+def _bitset(flags):
+    """Pack bytes of 0/1 flags into an int with bit i set when flags[i] is 1"""
+    return int(flags.translate(_FLAGS_TO_DIGITS)[::-1], 2) if flags else 0
+
+
+def _selector(bits, count):
+    """Unpack an int bitset into count bytes of 0/1 flags, usable with itertools.compress"""
+    return format(bits, f'0{count}b')[::-1].encode('ascii').translate(_DIGITS_TO_FLAGS)
+
+
+class PathSearchIndex:
+    """
+    Prebuilt index for fuzzy/substring search over relative file paths.
+
+    Paths are grouped by directory, so the directory part of a query match is
+    worked out once per directory instead of once per file, and only the
+    short file names are checked individually. Matching is greedy: each term
+    consumes as much as it can of the directory path, and the remainder must
+    appear in the file name.
+
+    For every character that occurs in any path (and in any file name), the
+    index also keeps a bitset of the paths containing it, stored as a Python
+    int with one bit per path. ANDing the bitsets of a query's characters
+    rules out most paths in a single C-level operation; the result is then
+    unpacked into one byte per path, which itertools.compress and bytes.find
+    can use, and whole directories without any remaining candidate are
+    skipped.
+    """
+
+    def __init__(self, relative_paths):
+        # Internal order: paths grouped by directory, in order of first appearance.
+        # Paths from FileTreeStore.relative_file_paths are already grouped this way
+        dir_ids = {}
+        split = []
+        for path in relative_paths:
+            directory, slash, name = path.lower().rpartition('/')
+            split.append((dir_ids.setdefault(directory + slash, len(dir_ids)), name))
+        order = sorted(range(len(split)), key=lambda i: split[i][0])
+        self._order = None if all(map(operator.eq, order, range(len(order)))) else array('i', order)
+
+        self._dirs = list(dir_ids)  # Lowercased directory prefixes including the trailing '/'
+        self._names = [split[i][1] for i in order]
+        self._dir_starts = array('i', [0] * (len(self._dirs) + 1))
+        for i in order:
+            self._dir_starts[split[i][0] + 1] += 1
+        for d in range(len(self._dirs)):
+            self._dir_starts[d + 1] += self._dir_starts[d]
+
+        count = len(self._names)
+        self._all = (1 << count) - 1
+        paths = list(map(operator.add, map(self._dirs.__getitem__, (split[i][0] for i in order)), self._names))
+        self.char_bits = self._char_bitsets(paths)
+        self.name_char_bits = self._char_bitsets(self._names)
+
+    @staticmethod
+    def _char_bitsets(strings):
+        """Map each character to a bitset of the strings containing it"""
+        bitsets = {}
+        for c in set("".join(strings)):
+            bitsets[c] = _bitset(bytes(map(operator.contains, strings, repeat(c))))
+        return bitsets
+
+    def __len__(self):
+        return len(self._names)
+
+    def _compile(self, term):
+        """
+        Regex matching strings that contain term as a subsequence, e.g. 'u/http'
+        matches 'utils/http.py'. Between two characters it skips anything
+        except the next wanted character, so it never backtracks.
+        """
+        parts = [re.escape(term[0])]
+        for c in term[1:]:
+            parts.append(f"[^{re.escape(c)}]*{re.escape(c)}")
+        return re.compile("".join(parts))
+
+    def _compile_prefix(self, term):
+        """
+        Regex that greedily matches as many leading characters of term as
+        possible, in order, with one nested group per character; the number of
+        groups that did not participate is the length of the unmatched rest.
+        """
+        pattern = ""
+        for c in reversed(term):
+            c = re.escape(c)
+            pattern = f"[^{c}]*({c}{pattern})?"
+        return re.compile(pattern).match
+
+    def _name_selector(self, candidates, chars):
+        """Selector bytes for candidates whose file name contains all chars, or None if there are none"""
+        for c in set(chars):
+            bits = self.name_char_bits.get(c)
+            if bits is None:
+                return None
+            candidates &= bits
+        return _selector(candidates, len(self))
+
+    def search(self, query):
+        """
+        Return the sorted indices of paths matching query. Every
+        whitespace-separated term must appear in the path as a subsequence.
+        """
+        terms = query.lower().split()
+        if not terms:
+            return []
+
+        # Prefilter: paths containing every character of the query
+        candidates = self._all
+        for c in set("".join(terms)):
+            bits = self.char_bits.get(c)
+            if bits is None:
+                return []
+            candidates &= bits
+        selector = _selector(candidates, len(self))
+
+        prefix_matchers = [(term, len(term), self._compile_prefix(term)) for term in terms]
+        name_selectors = {}
+        name_searchers = {}
+        get_name = self._names.__getitem__
+        starts = self._dir_starts
+        matches = []
+        for d, directory in enumerate(self._dirs):
+            start, end = starts[d], starts[d + 1]
+            if selector.find(1, start, end) < 0:
+                continue
+            # Whatever each term cannot consume from the directory must be in the file name
+            rests = []
+            for term, length, match_prefix in prefix_matchers:
+                consumed = length - match_prefix(directory).groups().count(None)
+                if consumed < length:
+                    rests.append(term[consumed:])
+            rests = tuple(rests)
+
+            # Names containing every character of the rests; exact for single characters
+            name_selector = name_selectors.get(rests, b'')
+            if name_selector == b'':
+                name_selector = name_selectors[rests] = self._name_selector(candidates, "".join(rests))
+            if name_selector is None:
+                continue
+            found = compress(range(start, end), name_selector[start:end])
+            for rest in rests:
+                if len(rest) > 1:
+                    search = name_searchers.get(rest)
+                    if search is None:
+                        search = name_searchers[rest] = self._compile(rest).search
+                    found = list(found)
+                    found = compress(found, map(search, map(get_name, found)))
+            matches.extend(found)
+
+        if self._order is not None:
+            matches = sorted(map(self._order.__getitem__, matches))
+        return matches
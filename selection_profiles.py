@@ -0,0 +1,261 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+import json
+import os
+import re
+
+# Profiles are stored per root directory: {root_path: {profile_name: profile}}
+PROFILES_FILE = os.path.join(os.path.expanduser("~"), ".codebase2prompt", "profiles.json")
+
+
+def _load_all_profiles():
+    """Load the whole profile store, returning an empty store if it is missing or unreadable"""
+    try:
+        with open(PROFILES_FILE, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_all_profiles(data):
+    """Write the whole profile store atomically"""
+    os.makedirs(os.path.dirname(PROFILES_FILE), exist_ok=True)
+    tmp_path = PROFILES_FILE + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, PROFILES_FILE)
+
+
+def load_profiles(root_path):
+    """Return {name: profile} for the given root directory"""
+    return _load_all_profiles().get(os.path.abspath(root_path), {})
+
+
+def save_profile(root_path, name, profile):
+    """Create or replace a named profile for the given root directory"""
+    data = _load_all_profiles()
+    data.setdefault(os.path.abspath(root_path), {})[name] = {
+        'include': list(profile.get('include', [])),
+        'exclude': list(profile.get('exclude', [])),
+        'paths': list(profile.get('paths', [])),
+    }
+    _save_all_profiles(data)
+
+
+def delete_profile(root_path, name):
+    """Remove a named profile for the given root directory"""
+    data = _load_all_profiles()
+    profiles = data.get(os.path.abspath(root_path), {})
+    if name in profiles:
+        del profiles[name]
+        _save_all_profiles(data)
+
+
+def _translate_glob(glob):
+    """
+    Translate a path glob into a regex. '*' and '?' stop at '/', '**/' matches
+    any number of directories including none, a trailing '/**' matches
+    everything below a directory and '[...]' is a character class.
+    """
+    glob = glob.strip('/')
+    parts = []
+    i, n = 0, len(glob)
+    while i < n:
+        c = glob[i]
+        if glob.startswith('**/', i):
+            parts.append('(?:.*/)?')
+            i += 3
+        elif glob.startswith('**', i):
+            parts.append('.*')
+            i += 2
+        elif c == '*':
+            parts.append('[^/]*')
+            i += 1
+        elif c == '?':
+            parts.append('[^/]')
+            i += 1
+        elif c == '[' and glob.find(']', i + 2) != -1:
+            end = glob.find(']', i + 2)
+            chars = glob[i + 1:end]
+            negate = chars.startswith('!')
+            if negate:
+                chars = chars[1:]
+            # Escape what means something else inside a regex set
+            chars = re.sub(r'([\\\[&~|]|^\^)', r'\\\1', chars)
+            parts.append(f"[{'^' if negate else ''}{chars}]")
+            i = end + 1
+        else:
+            parts.append(re.escape(c))
+            i += 1
+    return "".join(parts) + r'\Z'
+
+
+def _compile_patterns(globs, explicit_paths=()):
+    """Combine globs and explicit paths into a single regex, or None if there is nothing to match"""
+    parts = [_translate_glob(g) for g in globs if g.strip('/')]
+    for path in explicit_paths:
+        path = path.strip('/')
+        if path:
+            # An explicit path matches the file itself or anything below it (a directory)
+            parts.append(re.escape(path) + r'(?:/.*)?\Z')
+    if not parts:
+        return None
+    return re.compile("|".join(f"(?:{p})" for p in parts), re.DOTALL)
+
+
+def match_profile(profile, relative_paths):
+    """
+    Return the indices of relative_paths selected by the profile.
+    relative_paths are '/'-separated and relative to the root directory.
+    A path is selected if it matches an include glob or an explicit path
+    (or lies under an explicit directory) and matches no exclude glob.
+    """
+    include = _compile_patterns(profile.get('include', []), profile.get('paths', []))
+    if include is None:
+        return []
+    exclude = _compile_patterns(profile.get('exclude', []))
+
+    include_match = include.match
+    if exclude is None:
+        return [i for i, p in enumerate(relative_paths) if include_match(p)]
+    exclude_match = exclude.match
+    return [i for i, p in enumerate(relative_paths) if include_match(p) and not exclude_match(p)]
+
+
+class SelectionProfileWindow(tk.Toplevel):
+    """Window for creating, editing and applying named selection profiles"""
+
+    def __init__(self, parent, root_path, get_selected_relative_paths, on_apply):
+        super().__init__(parent)
+        self.title("Selection Profiles")
+        self.geometry("700x560")
+        self.transient(parent)
+
+        self.root_path = root_path
+        self.get_selected_relative_paths = get_selected_relative_paths
+        self.on_apply = on_apply
+
+        self._create_widgets()
+        self._refresh_profile_list()
+
+    def _create_widgets(self):
+        """Create all UI components"""
+        ttk.Label(
+            self,
+            text=f"Profiles for: {self.root_path}",
+            font=("Segoe UI", 10)
+        ).pack(anchor="w", padx=10, pady=(10, 5))
+
+        body = ttk.Frame(self, padding=5)
+        body.pack(fill="both", expand=True, padx=5)
+
+        # Profile list
+        list_frame = ttk.LabelFrame(body, text="Profiles", padding=5)
+        list_frame.pack(side="left", fill="y", padx=(0, 5))
+        self.profile_list = tk.Listbox(list_frame, width=24, exportselection=False)
+        self.profile_list.pack(fill="both", expand=True)
+        self.profile_list.bind("<<ListboxSelect>>", self._on_profile_select)
+
+        # Profile editor
+        editor = ttk.Frame(body)
+        editor.pack(side="left", fill="both", expand=True)
+
+        name_row = ttk.Frame(editor)
+        name_row.pack(fill="x", pady=(0, 5))
+        ttk.Label(name_row, text="Name:").pack(side="left")
+        self.name_var = tk.StringVar()
+        ttk.Entry(name_row, textvariable=self.name_var).pack(side="left", fill="x", expand=True, padx=5)
+
+        self.include_text = self._create_labeled_text(editor, "Include globs (one per line, e.g. src/*.py or **/*.md)", 4)
+        self.exclude_text = self._create_labeled_text(editor, "Exclude globs (one per line, e.g. **/tests/**)", 4)
+        self.paths_text = self._create_labeled_text(editor, "Explicit paths (files or folders, relative to root)", 8)
+
+        # Button group
+        button_frame = ttk.Frame(self, padding=5)
+        button_frame.pack(fill="x", padx=10, pady=(0, 10))
+        ttk.Button(button_frame, text="Apply", style="Blue.TButton", command=self._apply).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Save", command=self._save).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Delete", command=self._delete).pack(side="left", padx=5)
+        ttk.Button(
+            button_frame,
+            text="Use Current Selection",
+            command=self._use_current_selection
+        ).pack(side="right", padx=5)
+
+    def _create_labeled_text(self, parent, label, height):
+        """Create a labeled multi-line text box"""
+        frame = ttk.LabelFrame(parent, text=label, padding=5)
+        frame.pack(fill="both", expand=True, pady=(0, 5))
+        text = tk.Text(frame, height=height, font=("Consolas", 10), borderwidth=1, relief="solid")
+        text.pack(fill="both", expand=True)
+        return text
+
+    def _refresh_profile_list(self):
+        """Reload profile names from disk"""
+        self.profiles = load_profiles(self.root_path)
+        self.profile_list.delete(0, "end")
+        for name in sorted(self.profiles):
+            self.profile_list.insert("end", name)
+
+    def _on_profile_select(self, event=None):
+        """Load the selected profile into the editor"""
+        selection = self.profile_list.curselection()
+        if not selection:
+            return
+        name = self.profile_list.get(selection[0])
+        profile = self.profiles.get(name, {})
+        self.name_var.set(name)
+        self._set_lines(self.include_text, profile.get('include', []))
+        self._set_lines(self.exclude_text, profile.get('exclude', []))
+        self._set_lines(self.paths_text, profile.get('paths', []))
+
+    def _set_lines(self, text_widget, lines):
+        text_widget.delete("1.0", "end")
+        text_widget.insert("1.0", "\n".join(lines))
+
+    def _get_lines(self, text_widget):
+        lines = text_widget.get("1.0", "end-1c").splitlines()
+        return [line.strip() for line in lines if line.strip()]
+
+    def _current_profile(self):
+        """Build a profile dict from the editor contents"""
+        return {
+            'include': self._get_lines(self.include_text),
+            'exclude': self._get_lines(self.exclude_text),
+            'paths': self._get_lines(self.paths_text),
+        }
+
+    def _use_current_selection(self):
+        """Fill the explicit paths with the files currently checked in the tree"""
+        self._set_lines(self.paths_text, self.get_selected_relative_paths())
+
+    def _save(self):
+        """Save the editor contents under the given name"""
+        name = self.name_var.get().strip()
+        if not name:
+            messagebox.showwarning("Missing Name", "Please enter a profile name.", parent=self)
+            return
+        try:
+            save_profile(self.root_path, name, self._current_profile())
+        except OSError as e:
+            messagebox.showerror("Save Failed", f"Could not save profile: {e}", parent=self)
+            return
+        self._refresh_profile_list()
+
+    def _delete(self):
+        """Delete the named profile"""
+        name = self.name_var.get().strip()
+        if not name or name not in self.profiles:
+            return
+        try:
+            delete_profile(self.root_path, name)
+        except OSError as e:
+            messagebox.showerror("Delete Failed", f"Could not delete profile: {e}", parent=self)
+            return
+        self.name_var.set("")
+        self._refresh_profile_list()
+
+    def _apply(self):
+        """Apply the editor contents to the file tree"""
+        self.on_apply(self._current_profile())